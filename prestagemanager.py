@@ -1,9 +1,30 @@
 import requests
 import argparse
+import csv
 import json
 import re
 import getpass
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 from requests.auth import HTTPBasicAuth
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+
+# Shared HTTP session. Keeps connections to the JSS alive between calls
+# so we only pay for the TCP/TLS handshake once. Transient 429/5xx
+# responses are retried by urllib3 with exponential backoff (honoring
+# any Retry-After header) so we don't hammer a rate-limited JSS.
+# raise_on_status=False hands the final response back once retries are
+# exhausted, so the status-code handling in each helper still runs
+# instead of an uncaught RetryError aborting the whole operation.
+retry = Retry(total=3, backoff_factor=1.0, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset(["GET", "POST"]), respect_retry_after_header=True, raise_on_status=False)
+session = requests.Session()
+session.headers.update({ "Accept" : "application/json" })
+session.mount("https://", HTTPAdapter(max_retries=retry, pool_connections=10, pool_maxsize=20))
 
 
 
@@ -43,13 +64,27 @@ global jss_username
 global jss_password
 
 # Constants by virtue
+_SCRUB = re.compile(r'\W+')
 mobile_device_scopes_url = "/api/v2/mobile-device-prestages/"
 computer_scopes_url = "/api/v2/computer-prestages/"
 remove_scope_suffix = "/scope/delete-multiple/"
 add_scope_suffix = "/scope/"
 
-# API Token
+# Maximum number of serials sent in a single bulk move request
+BULK_CHUNK = 500
+
+# Formatting options for raw error dumps in the bad device report
+_JSON_KW = dict(sort_keys=True, indent=2, separators=(',', ': '))
+
+# Fallback bearer token lifetime if the JSS doesn't report one. The real
+# session duration is tenant-configurable; 30 minutes is Jamf's default.
+TOKEN_TTL = 30 * 60
+
+# API Token, its local expiry deadline, and a lock so only one worker
+# thread refreshes at a time
 token = None
+token_expiry = 0.0
+token_lock = threading.Lock()
 
 # Array that will contain all errors thrown by bad device serials
 bad_device_report = []
@@ -94,79 +129,97 @@ speed_mode = ""
 #######################################################################
 
 
-# API Token Generator. User credentials must have sufficient permission 
-# to move devices between prestages. On failure, will attempt to get a 
-# token 2 more times. 
-def generate_token(attempts=0):
-    
+# API Token Generator. User credentials must have sufficient permission
+# to move devices between prestages. Transient errors are retried by the
+# session adapter, so any failure here is a real authorization problem.
+def generate_token():
+
     global token
+    global token_expiry
     global jss_url
     global jss_username
     global jss_password
-    
+
     print("\nGenerating new API token")
-    token_headers = { "Accept" : "application/json"}
-    token_request = requests.post(jss_url+"/api/v1/auth/token", headers=token_headers, auth=HTTPBasicAuth(jss_username, jss_password))
+    token_request = session.post(jss_url+"/api/v1/auth/token", auth=HTTPBasicAuth(jss_username, jss_password))
 
     if token_request.status_code != 200:
-        if attempts > 2:
-            print(f"There appears to be some kind of authorization error. JSS responded:\n{token_request.text}\n\nPlease try again later.\n")
-            exit()
-        else:
-            print("Couldn't generate new token. Trying again...")
-            generate_token(attempts=attempts+1)
+        print(f"There appears to be some kind of authorization error. JSS responded:\n{token_request.text}\n\nPlease try again later.\n")
+        exit()
     else:
-        token = token_request.json()['token']
-
-# Invalidates current token.
+        body = token_request.json()
+        token = body['token']
+        # The response's "expires" field is an ISO-8601 timestamp reflecting
+        # the tenant's configured session duration; fall back to Jamf's
+        # default lifetime if it's missing or unparseable.
+        try:
+            expires = datetime.fromisoformat(body['expires'].replace("Z", "+00:00"))
+            ttl = (expires - datetime.now(timezone.utc)).total_seconds()
+        except (KeyError, ValueError, AttributeError):
+            ttl = TOKEN_TTL
+        token_expiry = time.monotonic() + ttl - 60
+        session.headers["Authorization"] = "Bearer " + token
+
+# Refreshes the token shortly before its known TTL runs out, so helpers
+# never burn a failed round-trip discovering an expired token mid-run.
+# The lock keeps concurrent granular workers from refreshing twice.
+def check_token():
+    if time.monotonic() > token_expiry:
+        with token_lock:
+            if time.monotonic() > token_expiry:
+                generate_token()
+
+# Invalidates current token and releases the session's pooled connections.
 def kill_token():
     global token
     global jss_url
-    kill_headers = { "Accept" : "application/json", "Authorization" : "Bearer " + token }
-    kill_request = requests.post(jss_url+"/api/v1/auth/invalidate-token", headers=kill_headers)
+    kill_request = session.post(jss_url+"/api/v1/auth/invalidate-token")
     if kill_request.status_code != 204:
         print(f"There appears to be some kind of authorization error. JSS responded:\n{kill_request.text}")
+    session.close()
 
-# Handles regenerating bad tokens, and removing/logging bad serials from the provided CSV
+# Handles regenerating tokens that die before their tracked expiry, and
+# removing/logging bad serials from the provided CSV
 def error_handler(bad_request, serials=[]):
 
     global bad_device_report
 
-    if bad_request.json()['errors'][0]['code'] == "INVALID_TOKEN":
+    # Safety net for tenants whose session duration is shorter than the
+    # expiry we derived: refresh and retry with the same list.
+    if bad_request.status_code == 401:
         generate_token()
-        return None
+        return serials
+
+    body = bad_request.json()
 
-    if bad_request.json()['httpStatus'] == 400:
+    if body['httpStatus'] == 400:
         if len(serials) > 1:
             print("Attempting to remove bad devices from list. Retrying command...")
-            for error in bad_request.json()['errors']:
+            for error in body['errors']:
                 if error['field'] == "serialNumbers":
                     serials.remove(error['description'])
                     bad_device_report.append(error)
             return serials
         else:
             print("Skipping bad device...")
-            bad_device_report.append(bad_request.json()['errors'][0])
+            bad_device_report.append(body['errors'][0])
             return []
             
-# Jamf requires an "Optimistic Lock" to move devices between prestages 
+# Jamf requires an "Optimistic Lock" to move devices between prestages
 # to prevent race conditions. Uses error_handler for token checking.
-def get_lock_number(url, attempts=0):
-    
-    headers = {"Accept" : "application/json", "Content-Type": "application/json", "Authorization" : "Bearer " + token }
+# Transient 429/5xx errors are retried by the session adapter.
+def get_lock_number(url):
 
-    lock_request = requests.get(url + "/scope", headers=headers)
-    if lock_request.status_code != 200:
+    for attempt in range(3):
+        lock_request = session.get(url + "/scope")
+        if lock_request.status_code == 200:
+            return lock_request.json()['versionLock']
         print(f"JSS responded with the following error:\n{lock_request.text}")
-        if attempts > 2:
-            print("Failed to get Optimistic Lock code. Please try again later.")
-            exit()
-        else:
-            print("Error getting Optimistic Lock code. Trying again...")
-            error_handler(lock_request)
-            lock_request = get_lock_number(url, attempts=attempts+1)
+        print("Error getting Optimistic Lock code. Trying again...")
+        error_handler(lock_request)
 
-    return lock_request.json()['versionLock']
+    print("Failed to get Optimistic Lock code. Please try again later.")
+    exit()
     
     
 # API commands that facilitate moving devices between prestages. 
@@ -174,11 +227,11 @@ def get_lock_number(url, attempts=0):
 # Uses error_handler to remove bad devices from the array and retry.
 def move_devices(url, url_suffix, devices, attempts=0):
 
-    headers = {"Accept" : "application/json", "Content-Type": "application/json", "Authorization" : "Bearer " + token }
+    check_token()
 
     move_payload = { "serialNumbers" : devices, "versionLock" : get_lock_number(url) }
 
-    move_request = requests.post(url + url_suffix, json=move_payload, headers=headers)
+    move_request = session.post(url + url_suffix, json=move_payload)
     
     if move_request.status_code != 200:
         
@@ -195,22 +248,54 @@ def move_devices(url, url_suffix, devices, attempts=0):
         print("Success!")
 
 
+# Splits large bulk moves into BULK_CHUNK-sized requests. Keeps any one
+# payload small enough for the JSS to accept, and means a retry after a
+# bad serial only re-sends one chunk rather than the whole list.
+def move_devices_chunked(url, url_suffix, devices):
+    for i in range(0, len(devices), BULK_CHUNK):
+        move_devices(url=url, url_suffix=url_suffix, devices=devices[i:i+BULK_CHUNK])
+
+
+# Granular-mode workers. Moves touching distinct prestages are independent,
+# so each prestage gets its own thread, but moves within one prestage stay
+# sequential so its Optimistic Lock never sees concurrent writes.
+def remove_serials_granular(prestage_id, serials):
+    for serial in serials:
+        print(f"\nAttempting to remove device {serial} from {scope_names[prestage_id]}")
+        move_devices(url=scopes_url + prestage_id, url_suffix=remove_scope_suffix, devices=[serial])
+
+def add_serials_granular(prestage_id, serials):
+    for serial in serials:
+        print(f"\nAttempting to move device {serial} to {scope_names[prestage_id]}")
+        move_devices(url=scopes_url + prestage_id, url_suffix=add_scope_suffix, devices=[serial])
+
+
+# Looks up one bad serial in Jamf, returning its general info section or
+# None if the device isn't enrolled. Run concurrently by the report below.
+def get_device_general(serial):
+    info_request = session.get(jss_url+"/JSSResource/mobiledevices/serialnumber/" + serial)
+    if info_request.status_code == 200:
+        return serial, info_request.json()['mobile_device']['general']
+    return serial, None
+
+
 # All errors caused by bad device serials are appended to an array.
-# If this array contains any elements, the users is asked if they want 
-# to view them at the end of a run. Common errors are displayed in a 
+# If this array contains any elements, the users is asked if they want
+# to view them at the end of a run. Common errors are displayed in a
 # simple view prior to the raw error messages being printed.
+# Device lookups are fanned out over a small thread pool (the session is
+# thread-safe) so the report costs a few round-trips instead of one per serial.
 def print_bad_device_report():
 
     global jss_url
 
     print("\n\nGenerating report...\n")
 
-    headers = {"Accept" : "application/json", "Content-Type": "application/json", "Authorization" : "Bearer " + token }
+    check_token()
 
-    test_auth = requests.get(jss_url+"/api/v1/auth/", headers=headers)
-    if test_auth.status_code != 200:
-        generate_token()
-        headers['Authorization'] = "Bearer " + token
+    bad_serials = [error['description'] for error in bad_device_report]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        device_info = dict(pool.map(get_device_general, bad_serials))
 
     for error in bad_device_report:
 
@@ -219,16 +304,17 @@ def print_bad_device_report():
         serial = error['description']
         error_info += f"Device Serial: {serial}"
 
-        info_request = requests.get(jss_url+"/JSSResource/mobiledevices/serialnumber/" + serial, headers=headers)
-        if info_request.status_code == 200:
-            if 'asset_tag' in info_request.json()['mobile_device']['general'] and info_request.json()['mobile_device']['general']['asset_tag'] != "" and info_request.json()['mobile_device']['general']['asset_tag'] != serial:
-                error_info += f"Asset Tag: {info_request.json()['mobile_device']['general']['asset_tag']}"
+        general = device_info.get(serial)
+        if general is not None:
+            asset_tag = general.get('asset_tag', '')
+            if asset_tag != "" and asset_tag != serial:
+                error_info += f"Asset Tag: {asset_tag}"
             else:
                 error_info += "\nThis device is in Jamf but does not have an asset tag."
         else:
             error_info += "\nThis device is not in Jamf.\nIt may be mistyped or might not have ever been enrolled before."
 
-        error_info += f"\nRaw Error Info:\n{json.dumps(error, sort_keys=True, indent=2, separators=(',', ': '))}"
+        error_info += f"\nRaw Error Info:\n{json.dumps(error, **_JSON_KW)}"
 
         print(error_info + "\n")
 
@@ -320,14 +406,13 @@ try:
 
     # Get device scoping info
     print("\nGetting scope info for all devices")
-    scopes_headers = { "Accept" : "application/json", "Authorization" : "Bearer " + token }
-    scopes_request = requests.get(scopes_url + "scope", headers=scopes_headers)
+    scopes_request = session.get(scopes_url + "scope")
     scoped_serials = scopes_request.json()["serialsByPrestageId"]
 
     scopes_url = scopes_url.replace("/v2/", "/v3/")
 
     # Get info of all scope names and IDs. Hard limit of 200 prestages.
-    scope_info_request = requests.get(scopes_url + "?page-size=200&sort=displayName%3Aasc", headers=scopes_headers)
+    scope_info_request = session.get(scopes_url + "?page-size=200&sort=displayName%3Aasc")
 
     jamf_set_default_id = ""
 
@@ -341,14 +426,15 @@ try:
         if prestage['defaultPrestage'] == True:
             jamf_set_default_id = prestage['id']
 
+    # Case-folded name index for resolving --targetname/--defaultname and
+    # typed names without rescanning all prestages, plus a name-sorted
+    # listing for the interactive "list" option.
+    scope_names_by_lower = {name.lower(): prestage for prestage, name in scope_names.items()}
+    scope_names_sorted = sorted(scope_names.items(), key=lambda kv: kv[1])
+
     scopes_url = scopes_url.replace("/v3/", "/v2/")
 
-    # Determine theoretical prestage max ID in order to determine bulk movements
     print(f'\nTotal number of scoped devices: {len(scoped_serials)}')
-    max_prestages = 0
-    for scope in scope_names:
-        if int(scope) > max_prestages:
-            max_prestages = int(scope)
 
 
     # Set target prestage ID
@@ -359,9 +445,7 @@ try:
         target_id = jamf_set_default_id
 
     if args.targetname is not None:
-        for prestage in scope_names:
-            if args.targetname.lower() == scope_names[prestage].lower():
-                target_id = prestage
+        target_id = scope_names_by_lower.get(args.targetname.lower(), target_id)
 
     while target_id == "" or target_id.lower() == "list":
         print("\nEnter the ID or name of the prestage you wish to target.")
@@ -371,8 +455,8 @@ try:
         target_id = input("Alternatively, type \"list\" to see a list of all prestages and their IDs: ")
         if target_id == "list":
             print()
-            for prestage in scope_names:
-                print(f"{scope_names[prestage]}: {prestage}")
+            for prestage, name in scope_names_sorted:
+                print(f"{name}: {prestage}")
         elif target_id.isnumeric() or target_id == "-1":
             if target_id not in scope_names and target_id != "-1":
                 print("\nThis does not appear to be a valid prestage ID number.")
@@ -380,9 +464,7 @@ try:
         elif target_id == "" and jamf_set_default_id != "":
             target_id = jamf_set_default_id
         else:
-            for prestage in scope_names:
-                if target_id.lower() == scope_names[prestage].lower():
-                    target_id = prestage
+            target_id = scope_names_by_lower.get(target_id.lower(), target_id)
             if not target_id in scope_names:
                 print("\nThis does not appear to be a valid prestage name.")
                 target_id = ""
@@ -397,9 +479,7 @@ try:
         default_prestage_id = ""
 
     if args.defaultname is not None:
-        for prestage in scope_names:
-            if args.defaultname.lower() == scope_names[prestage].lower():
-                default_prestage_id = prestage
+        default_prestage_id = scope_names_by_lower.get(args.defaultname.lower(), default_prestage_id)
 
     while option.lower() == "exact" and default_prestage_id == "":
         print("\nExact mode enabled. Please enter the ID of the prestage you want extra devices to be moved to. ")
@@ -409,8 +489,8 @@ try:
         default_prestage_id = input("Alternatively, type \"list\" to see a list of all prestages and their IDs: ")
         if default_prestage_id == "list":
             print()
-            for prestage in scope_names:
-                print(f"{scope_names[prestage]}: {prestage}")
+            for prestage, name in scope_names_sorted:
+                print(f"{name}: {prestage}")
         elif default_prestage_id.isnumeric() or default_prestage_id == "-1":
             if default_prestage_id not in scope_names and default_prestage_id != "-1":
                 print("\nThis does not appear to be a valid prestage ID number.")
@@ -418,9 +498,7 @@ try:
         elif default_prestage_id == "" and jamf_set_default_id != "":
             default_prestage_id = jamf_set_default_id
         else:
-            for prestage in scope_names:
-                if default_prestage_id.lower() == scope_names[prestage].lower():
-                    default_prestage_id = prestage
+            default_prestage_id = scope_names_by_lower.get(default_prestage_id.lower(), default_prestage_id)
             if not default_prestage_id in scope_names:
                 print("\nThis does not appear to be a valid prestage name.")
                 default_prestage_id = ""
@@ -433,135 +511,141 @@ try:
         exit()
 
 
-    # Determine number of devices in target prestage
-    scoped_count = 0
-    for serial in scoped_serials:
-        if (target_id != "-1"  and scoped_serials[serial] == target_id):
-            scoped_count += 1
+    # Devices currently in the target prestage, computed in one pass. Set
+    # operations against the CSV serials replace the later counting and
+    # exact-mode reconciliation loops.
+    target_holders = {serial for serial, prestage in scoped_serials.items() if prestage == target_id}
 
     if target_id != "-1":
-        print(f'\nTotal number of devices in target prestage {scope_names[target_id]}: {scoped_count}\n')
+        print(f'\nTotal number of devices in target prestage {scope_names[target_id]}: {len(target_holders)}\n')
 
 
-    # Set up a series of empty arrays to later map out bulk transfer movements
+    # Maps source prestage IDs to the devices leaving them, to later map out
+    # bulk transfer movements. Groups are created on demand so sparse prestage
+    # IDs cost nothing.
     if speed.lower() == "bulk":
-        bulk_transfers = {}
-        for i in range(max_prestages + 1):
-            bulk_transfers[i] = []
+        bulk_transfers = defaultdict(list)
 
     # Load file by path
-    file = None
+    target_set = None
     if args.file is not None:
         target_file = args.file
     else:
-        target_file = input("\nEnter the path of the CSV of serials you wish to process or drag the file into the terminal. \nThe file must not have a header: ")    
+        target_file = input("\nEnter the path of the CSV of serials you wish to process or drag the file into the terminal. \nThe file must not have a header: ")
         print("\n")
 
-    while file is None:
+    # Stream the CSV row by row, scrubbing any junk data out of serial numbers
+    # (useful for laser scanning errors) as we go. Reading straight into a set
+    # collapses duplicate serials (a common paste error) and keeps only one
+    # copy of the data in memory; order doesn't matter downstream. The with
+    # block guarantees the file closes even on CTRL+C.
+    while target_set is None:
         try:
-            file = open(target_file.strip(), "r", encoding="utf-8")
-            file_serials = file.readlines()
-        except:
+            with open(target_file.strip(), "r", encoding="utf-8", newline="") as file:
+                target_set = {_SCRUB.sub('', row[0].strip().upper()) for row in csv.reader(file) if row}
+        except (OSError, UnicodeDecodeError):
             print("ERROR: The file name/path entered either does not exist or contains non-CSV data.")
             target_file = input("\nEnter the path of the CSV of serials you wish to process or drag the file into the terminal. \nThe file must not have a header: ")
             print("\n")
 
-    
-    target_serials = []
-
-    # Scrub any junk data out of serial numbers (useful for laser scanning errors) and add to an array
-    for serial in file_serials:
-        target_serials.append(re.sub(r'\W+', '', serial.strip().upper()))
-
 
     # Count number of devices already in target prestage and report to user
-    existing_count = 0
-    for serial in target_serials:
-        if serial in scoped_serials:
-            if (target_id != "-1"  and scoped_serials[serial] == target_id):
-                existing_count += 1
+    existing_count = len(target_set & target_holders)
 
     if existing_count > 0 and target_id != "-1":
-        print(f"Found {existing_count} of {len(target_serials)} devices already in {scope_names[target_id]}\n")
+        print(f"Found {existing_count} of {len(target_set)} devices already in {scope_names[target_id]}\n")
 
     if target_id != "-1":
-        print(f"Preparing to move {len(target_serials) - existing_count} devices to {scope_names[target_id]}...")
+        print(f"Preparing to move {len(target_set) - existing_count} devices to {scope_names[target_id]}...")
     else:
-        print(f"\nPreparing to unassign up to {len(target_serials)} devices...")
+        print(f"\nPreparing to unassign up to {len(target_set)} devices...")
 
-    # Move devices one at a time
+    # Re-running an already-applied CSV in append mode is a no-op; bail out
+    # before any move or lock requests are made.
+    if target_id != "-1" and existing_count == len(target_set) and option.lower() != "exact":
+        print("\nAll devices are already in the target prestage. Nothing to do.")
+        print("\nKilling API token and exiting...\n")
+        kill_token()
+        exit()
+
+    # Move devices one at a time. Moves are grouped by the prestage they
+    # touch and each group runs on its own thread, so the per-serial round
+    # trips overlap across prestages. All removals finish before any
+    # additions start so a device is never in two prestages at once.
     if speed.lower() == "granular":
-        
-        for serial in target_serials:
+
+        granular_removals = defaultdict(list)
+        granular_additions = defaultdict(list)
+
+        for serial in target_set:
 
             if not serial in scoped_serials:
-                
+
                 if target_id != "-1":
-                    print(f"\nAttempting to add the unassigned device {serial} to {scope_names[target_id]}")
-                    move_devices(url=scopes_url + target_id, url_suffix=add_scope_suffix, devices=[serial])
+                    granular_additions[target_id].append(serial)
                 else:
                     print(f"\nDevice {serial} already unassigned.")
 
             elif scoped_serials[serial] != target_id:
-                
-                print(f"\nAttempting to remove device {serial} from {scope_names[scoped_serials[serial]]}")    
-                move_devices(url=scopes_url + scoped_serials[serial], url_suffix=remove_scope_suffix, devices=[serial])
+
+                granular_removals[scoped_serials[serial]].append(serial)
                 if target_id != "-1":
-                    print(f"\nAttempting to move device {serial} to prestage {scope_names[target_id]}") 
-                    move_devices(url=scopes_url + target_id, url_suffix=add_scope_suffix, devices=[serial])
+                    granular_additions[target_id].append(serial)
 
         # Move any extra devices to default prestage
         if option.lower() == "exact":
 
-            for serial in scoped_serials:
-                if scoped_serials[serial] == target_id and not serial in target_serials:
-                    print(f"\nAttempting to remove device {serial} from {scope_names[target_id]}")    
-                    move_devices(url=scopes_url + target_id, url_suffix=remove_scope_suffix, devices=[serial])
-                    if default_prestage_id != "-1":
-                        print(f"\nAttempting to move device {serial} to {scope_names[default_prestage_id]}") 
-                        move_devices(url=scopes_url + default_prestage_id, url_suffix=add_scope_suffix, devices=[serial])
+            for serial in target_holders - target_set:
+                granular_removals[target_id].append(serial)
+                if default_prestage_id != "-1":
+                    granular_additions[default_prestage_id].append(serial)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(remove_serials_granular, granular_removals.keys(), granular_removals.values()))
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(add_serials_granular, granular_additions.keys(), granular_additions.values()))
 
     # Moves all devices in bulk transfers
     if speed.lower() == "bulk":
 
-        for serial in target_serials:
+        # Prestage IDs stay as the strings Jamf returns, so grouping and the
+        # emit loop below never round-trip them through int()/str().
+        for serial in target_set:
+
+            prestage_id = scoped_serials.get(serial)
+            if prestage_id is None:
+                bulk_transfers["_unassigned"].append(serial)
+            elif prestage_id != target_id:
+                bulk_transfers[prestage_id].append(serial)
+
+        # Only groups that actually received devices exist, so every visit does work.
+        for prestage_id, devices in bulk_transfers.items():
+            if prestage_id == "_unassigned" and target_id == "-1":
+                print(f"\n{len(devices)} devices already unassigned.")
+
+            elif prestage_id == "_unassigned":
+                print(f"\nAttempting to move {len(devices)} unassigned devices to {scope_names[target_id]}")
+                move_devices_chunked(url=scopes_url + target_id, url_suffix=add_scope_suffix, devices=devices)
 
-            if not serial in scoped_serials:
-                bulk_transfers[0].append(serial)
             else:
-                if scoped_serials[serial] != target_id:
-                    bulk_transfers[int(scoped_serials[serial])].append(serial)
-
-        for prestage_id in bulk_transfers:
-            if len(bulk_transfers[prestage_id]) > 0 and not (prestage_id == 0 and target_id == "-1"):
-                if prestage_id == 0:
-                    print(f"\nAttempting to move {len(bulk_transfers[prestage_id])} unassigned devices to {scope_names[target_id]}")
-                    move_devices(url=scopes_url + target_id, url_suffix=add_scope_suffix, devices=bulk_transfers[prestage_id])
-                    
-                else:
-                    print(f"\nAttempting to remove {len(bulk_transfers[prestage_id])} devices from {scope_names[str(prestage_id)]}")
-                    move_devices(url=scopes_url + str(prestage_id), url_suffix=remove_scope_suffix, devices=bulk_transfers[prestage_id])
-                    if target_id != "-1":
-                        print(f"\nAttempting to move {len(bulk_transfers[prestage_id])} devices to {scope_names[target_id]}")
-                        move_devices(url=scopes_url + target_id, url_suffix=add_scope_suffix, devices=bulk_transfers[prestage_id])
-            
-            elif prestage_id == 0 and target_id == "-1":
-                print(f"\n{len(bulk_transfers[prestage_id])} devices already unassigned.")
+                print(f"\nAttempting to remove {len(devices)} devices from {scope_names[prestage_id]}")
+                move_devices_chunked(url=scopes_url + prestage_id, url_suffix=remove_scope_suffix, devices=devices)
+                if target_id != "-1":
+                    print(f"\nAttempting to move {len(devices)} devices to {scope_names[target_id]}")
+                    move_devices_chunked(url=scopes_url + target_id, url_suffix=add_scope_suffix, devices=devices)
 
         # Moves all devices in prestage not found in CSV to default prestage all at once.            
         if option.lower() == "exact":
 
-            dep_devices = []
-            for serial in scoped_serials:
-                if scoped_serials[serial] == target_id and not serial in target_serials:
-                    dep_devices.append(serial)
+            dep_devices = list(target_holders - target_set)
 
             if len(dep_devices) > 0:
                 print(f"\nAttempting to remove {len(dep_devices)} devices from {scope_names[target_id]}")
-                move_devices(url=scopes_url + target_id, url_suffix=remove_scope_suffix, devices=dep_devices)
+                move_devices_chunked(url=scopes_url + target_id, url_suffix=remove_scope_suffix, devices=dep_devices)
                 if default_prestage_id != "-1":
                     print(f"\nAttempting to move {len(dep_devices)} devices to {scope_names[default_prestage_id]}")
-                    move_devices(url=scopes_url + default_prestage_id, url_suffix=add_scope_suffix, devices=dep_devices)
+                    move_devices_chunked(url=scopes_url + default_prestage_id, url_suffix=add_scope_suffix, devices=dep_devices)
 
 
     # Confirm completion and inquire about printing errors.